@@ -8,15 +8,24 @@ multiscale nonlinear physics. Physics Review E, 99(6),
 """
 
 import copy
+import functools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
 import numpy as np
+from scipy.linalg.blas import get_blas_funcs
 from sklearn.cluster import MiniBatchKMeans
-from sklearn.metrics import silhouette_score
+from sklearn.utils.extmath import randomized_svd
 import matplotlib.pyplot as plt
 import xarray as xr
 
 from pydmd.bopdmd import BOPDMD
-from .utils import compute_rank, compute_svd
+from .utils import _compute_rank, compute_rank, compute_svd
+
+# Netcdf cannot store None, which is stored as this string instead.
+_NONE_SENTINEL = "None"
 
 
 class COSTS:
@@ -70,8 +79,37 @@ class COSTS:
     :param reset_alpha_init: Flag specifying if the initial eigenvalue guess
         should be reset between windows.
     :type reset_alpha_init: bool
+    :param use_randomized_svd: Flag specifying if the global svd projection
+        basis of a fixed integer `svd_rank` well below the data dimensions
+        should be found with a randomized svd. This is faster for large data
+        but only approximates the leading singular vectors, which can change
+        the fitted windows. Default is False, which uses the exact svd.
+    :type use_randomized_svd: bool
+    :param cache_reconstruction: Flag specifying if the latest scale
+        reconstruction should be kept until the next fit or clustering.
+        Repeated reconstructions (e.g., from the plotting methods) are then
+        free, at the memory cost of one n_components x n_data_vars x
+        n_time_steps array. Default is False.
+    :type cache_reconstruction: bool
     """
 
+    # Scalar attributes written by `to_xarray`, in the order of their values.
+    _ATTR_KEYS = (
+        "svd_rank",
+        "n_slides",
+        "window_length",
+        "num_frequency_bands",
+        "n_data_vars",
+        "n_time_steps",
+        "step_size",
+        "non_integer_n_slide",
+        "global_svd",
+    )
+
+    # Upper bound on the number of elements of the intermediate per-window
+    # arrays in `fit` and `scale_reconstruction` (64 MB of complex128).
+    _CHUNK_ELEMENTS = 2**22
+
     def __init__(
         self,
         svd_rank=None,
@@ -85,7 +123,21 @@ class COSTS:
         force_even_eigs=True,
         max_rank=None,
         n_components=None,
+        use_randomized_svd=False,
+        cache_reconstruction=False,
     ):
+        # The user accidentally provided both methods of initializing the
+        # eigenvalues.
+        if (
+            initialize_artificially
+            and init_alpha is not None
+            and cluster_centroids is not None
+        ):
+            raise ValueError(
+                "Only one of `init_alpha` and `cluster_centroids` can be"
+                " provided"
+            )
+
         self._hist_kwargs = None
         self._omega_label = None
         self._step_size = None
@@ -99,6 +151,8 @@ class COSTS:
         self._cluster_centroids = cluster_centroids
         self._force_even_eigs = force_even_eigs
         self._max_rank = max_rank
+        self._use_randomized_svd = use_randomized_svd
+        self._cache_reconstruction = cache_reconstruction
         self._reset_alpha_init = reset_alpha_init
 
         # Initialize variables that are defined in fitting.
@@ -116,6 +170,12 @@ class COSTS:
         self._window_means_array = None
         self._non_integer_n_slide = None
         self._svd_rank_pre_allocate = None
+        self._window_starts = None
+        self._window_stops = None
+        self._window_indices = None
+        self._window_slices = None
+        self._scale_recon_cache = {}
+        self._omega_transform_cache = {}
 
         # Specify default keywords to hand to BOPDMD.
         if pydmd_kwargs is None:
@@ -259,9 +319,8 @@ class COSTS:
         """
         if self._omega_array is None:
             raise ValueError("The object must be fit first.")
-        frequencies = np.abs(
-            self._omega_array[self._omega_classes > 0].imag.flatten()
-        )
+        # Boolean indexing already returns a 1D copy.
+        frequencies = np.abs(self._omega_array[self._omega_classes > 0].imag)
         return 2 * np.pi / frequencies
 
     @staticmethod
@@ -275,7 +334,13 @@ class COSTS:
         :return: Relative error between observations and model.
         :rtype: numpy.ndarray
         """
-        return np.linalg.norm(x_est - x_true) / np.linalg.norm(x_true)
+        # BLAS nrm2 matching the array dtype skips the dispatch overhead of
+        # np.linalg.norm.
+        x_true = np.asarray(x_true)
+        residual = np.subtract(x_est, x_true).ravel()
+        residual_norm = get_blas_funcs("nrm2", (residual,))(residual)
+        true_norm = get_blas_funcs("nrm2", (x_true,))(x_true.ravel())
+        return residual_norm / true_norm
 
     @staticmethod
     def _build_windows(data, window_length, step_size, integer_windows=False):
@@ -294,19 +359,17 @@ class COSTS:
         :return: Number of windows to fit.
         :rtype: int
         """
+        n_steps = data.shape[1]
         if integer_windows:
-            n_split = np.floor(data.shape[1] / window_length).astype(int)
-        else:
-            n_split = data.shape[1] / window_length
-
-        n_steps = int((window_length * n_split))
+            n_steps = (n_steps // window_length) * window_length
 
         # Number of sliding-window iterations
-        n_slides = np.floor((n_steps - window_length) / step_size).astype(int)
+        n_slides = (n_steps - window_length) // step_size
 
         return n_slides + 1
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def calculate_lv_kern(window_length, corner_sharpness=None):
         """Calculate the kerning window for suppressing real eigenvalues.
 
@@ -315,7 +378,8 @@ class COSTS:
         :type corner_sharpness: int
         :param window_length: Size of the window in time steps to kern.
         :type window_length: int
-        :return: Kernel for convolving with the windowed data.
+        :return: Kernel for convolving with the windowed data. The kernel is
+            cached and shared between calls, so it is read-only.
         :rtype: np.ndarray
         """
 
@@ -323,23 +387,21 @@ class COSTS:
         if corner_sharpness is None:
             corner_sharpness = 16
 
-        lv_kern = (
-            np.tanh(
-                corner_sharpness
-                * np.arange(1, window_length + 1)
-                / window_length
-            )
-            - np.tanh(
-                corner_sharpness
-                * (np.arange(1, window_length + 1) - window_length)
-                / window_length
-            )
-            - 1
-        )
+        # tanh is odd, so the trailing term tanh(cs * (i - n) / n) equals
+        # -tanh(cs * (n - i) / n). Both terms are then read from a single tanh
+        # evaluation over i = 0, ..., n instead of two.
+        tanh_kern = np.arange(window_length + 1, dtype=float)
+        tanh_kern *= corner_sharpness
+        tanh_kern /= window_length
+        np.tanh(tanh_kern, out=tanh_kern)
+        lv_kern = tanh_kern[1:] + tanh_kern[window_length - 1 :: -1]
+        lv_kern -= 1
+        lv_kern.flags.writeable = False
 
         return lv_kern
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def build_kern(window_length):
         """Build the convolution kernel for the window reconstruction.
 
@@ -349,14 +411,18 @@ class COSTS:
 
         :param window_length: Length of the data window in units of time
         :type window_length: int
-        :return: Gaussian filter of length `window_length`
+        :return: Gaussian filter of length `window_length`. The filter is
+            cached and shared between calls, so it is read-only.
         :rtype: np.ndarray
         """
         recon_filter_sd = window_length / 8
-        recon_filter = np.exp(
-            -((np.arange(window_length) - (window_length + 1) / 2) ** 2)
-            / recon_filter_sd**2
-        )
+        recon_filter = np.arange(window_length, dtype=float)
+        recon_filter -= (window_length + 1) / 2
+        np.square(recon_filter, out=recon_filter)
+        recon_filter /= recon_filter_sd**2
+        np.negative(recon_filter, out=recon_filter)
+        np.exp(recon_filter, out=recon_filter)
+        recon_filter.flags.writeable = False
         return recon_filter
 
     @staticmethod
@@ -374,6 +440,29 @@ class COSTS:
         n_data_vars = np.shape(data)[0]
         return n_time_steps, n_data_vars
 
+    @staticmethod
+    def _n_threads(n_jobs):
+        """Returns the number of threads for a `n_jobs` argument.
+
+        :param n_jobs: Number of threads. None maps to a single thread and -1
+            to all processors.
+        :type n_jobs: int or NoneType
+        :return: Number of threads.
+        :rtype: int
+        """
+        if n_jobs is None:
+            return 1
+        if isinstance(n_jobs, (int, np.integer)) and not isinstance(
+            n_jobs, bool
+        ):
+            if n_jobs == -1:
+                return os.cpu_count() or 1
+            if n_jobs > 0:
+                return int(n_jobs)
+        raise ValueError(
+            f"n_jobs must be None, -1, or a positive integer, not {n_jobs!r}."
+        )
+
     def _build_proj_basis(self, data, svd_rank=None):
         """Build the projection basis.
 
@@ -384,9 +473,32 @@ class COSTS:
         :return: SVD projection basis for COSTS.
         :rtype: numpy.ndarray
         """
-        self._svd_rank = compute_rank(data, svd_rank=svd_rank)
-        # Recover the first r modes of the global svd
-        return compute_svd(data, svd_rank=svd_rank)[0]
+        # A fixed rank well below the data dimensions only needs the leading
+        # left singular vectors, which a randomized range finder recovers for
+        # O(mnr) instead of the O(mn min(m, n)) cost of a full svd. The power
+        # iterations follow the scikit-learn default for small ranks.
+        n_oversamples = 10
+        if (
+            self._use_randomized_svd
+            and isinstance(svd_rank, (int, np.integer))
+            and svd_rank > 0
+            and svd_rank + n_oversamples < min(data.shape)
+        ):
+            self._svd_rank = int(svd_rank)
+            return randomized_svd(
+                data,
+                n_components=self._svd_rank,
+                n_oversamples=n_oversamples,
+                n_iter=7,
+                random_state=0,
+            )[0]
+
+        # Automatic rank selection needs the full singular value spectrum.
+        # Recover the first r modes of the global svd, which also gives the
+        # rank without a second decomposition.
+        u = compute_svd(data, svd_rank=svd_rank)[0]
+        self._svd_rank = u.shape[-1]
+        return u
 
     def _build_initialization(self):
         """Method for making initial guess of DMD eigenvalues.
@@ -394,34 +506,24 @@ class COSTS:
         :return: First guess of eigenvalues
         :rtype: numpy.ndarray or None
         """
+        # Without artificial initialization the first iteration of BOPDMD
+        # searches for the initial values.
+        if not self._initialize_artificially:
+            return None
         # User provided initial eigenvalues.
-        if self._initialize_artificially and self._init_alpha is not None:
+        if self._init_alpha is not None:
             return self._init_alpha
         # Initial eigenvalue guesses from kmeans clustering.
-        elif (
-            self._initialize_artificially
-            and self._init_alpha is None
-            and self._cluster_centroids is not None
-        ):
-            init_alpha = np.repeat(
-                np.sqrt(self._cluster_centroids) * 1j,
-                int(self._svd_rank / self._n_components),
-            )
-            init_alpha = init_alpha * np.tile(
-                [1, -1], int(self._svd_rank / self._n_components)
-            )
+        if self._cluster_centroids is not None:
+            # Each centroid is repeated as alternating conjugate pairs, i.e.
+            # [+c0, -c0, ..., +c1, -c1, ...], built with a single broadcast.
+            n_eigs_per_band = int(self._svd_rank / self._n_components)
+            signs = np.ones(n_eigs_per_band)
+            signs[1::2] = -1
+            init_alpha = (
+                np.sqrt(self._cluster_centroids)[:, np.newaxis] * 1j * signs
+            ).ravel()
             return init_alpha
-        # The user accidentally provided both methods of initializing the
-        # eigenvalues.
-        if (
-            self._initialize_artificially
-            and self._init_alpha is not None
-            and self._cluster_centroids is not None
-        ):
-            raise ValueError(
-                "Only one of `init_alpha` and `cluster_centroids` can be"
-                " provided"
-            )
 
         # In all other cases we return None and let the first iteration of
         # BOPDMD searches for the initial values.
@@ -435,6 +537,8 @@ class COSTS:
         step_size,
         verbose=False,
         corner_sharpness=None,
+        n_jobs=None,
+        precision="double",
     ):
         """Fit COherent SpatioTemporal Scale separation (COSTS).
 
@@ -453,9 +557,23 @@ class COSTS:
         :type verbose: bool
         :param corner_sharpness: See `calculate_lv_kern`
         :type corner_sharpness: float or int
+        :param n_jobs: Number of threads for fitting the windows in parallel.
+            Only available with `global_svd` and without bagging, where the
+            windows are fit independently and reproducibly. -1 uses all
+            processors. Default is None, which fits the windows
+            sequentially. With threads, the progress printed by `verbose`
+            may be out of order.
+        :type n_jobs: int or NoneType
+        :param precision: Floating point precision for storing the fitted
+            modes, eigenvalues, and amplitudes of each window. Either
+            "single" (complex64) or "double" (complex128). Default is
+            "double". Single precision is carried through the scale
+            reconstruction, which is then float32.
+        :type precision: str
         """
 
         # Prepare window and data properties.
+        self._invalidate_caches()
         self._window_length = window_length
         self._step_size = step_size
         self._n_time_steps, self._n_data_vars = self._data_shape(data)
@@ -463,6 +581,29 @@ class COSTS:
         if not self._n_time_steps == time.size:
             raise ValueError("Data and time dimensions do not align.")
 
+        if precision == "double":
+            complex_dtype = np.complex128
+        elif precision == "single":
+            complex_dtype = np.complex64
+        else:
+            raise ValueError(
+                f"Precision {precision:} not supported. "
+                "Use 'single' or 'double'."
+            )
+
+        n_jobs = self._n_threads(n_jobs)
+        if n_jobs > 1 and not self._global_svd:
+            raise ValueError(
+                "Fitting windows in parallel requires global_svd=True."
+            )
+        # Bagging draws from the global numpy random state, which the threads
+        # would consume in an arbitrary order.
+        if n_jobs > 1 and self._pydmd_kwargs.get("num_trials", 0) > 0:
+            raise ValueError(
+                "Fitting windows in parallel is not reproducible with "
+                "bagging (num_trials > 0)."
+            )
+
         self._n_slides = self._build_windows(
             data,
             self._window_length,
@@ -488,6 +629,12 @@ class COSTS:
             self._non_integer_n_slide = True
         else:
             self._non_integer_n_slide = False
+        self._build_window_indices()
+
+        # The rank truncation only treats python ints as a fixed rank, so
+        # numpy integer ranks (e.g., read back from file) are converted.
+        if isinstance(self._svd_rank, np.integer):
+            self._svd_rank = int(self._svd_rank)
 
         # Build the projection basis if using a global svd.
         if self._global_svd:
@@ -496,7 +643,7 @@ class COSTS:
             self._pydmd_kwargs["use_proj"] = self._pydmd_kwargs.get(
                 "use_proj", False
             )
-            self._svd_rank = compute_rank(data, svd_rank=self._svd_rank)
+            # _build_proj_basis already resolved the rank of the basis.
             self._svd_rank_pre_allocate = self._svd_rank
         elif not self._global_svd and self._svd_rank > 0:
             if self._force_even_eigs and self._svd_rank % 2:
@@ -507,9 +654,16 @@ class COSTS:
                 raise ValueError(
                     "Rank is larger than the data spatial dimension."
                 )
-            self._svd_rank_pre_allocate = compute_rank(
-                data, svd_rank=self._svd_rank
-            )
+            # A fixed integer rank only needs capping by the data shape, no
+            # decomposition is required.
+            if isinstance(self._svd_rank, int):
+                self._svd_rank_pre_allocate = min(
+                    self._svd_rank, self._n_data_vars, self._n_time_steps
+                )
+            else:
+                self._svd_rank_pre_allocate = compute_rank(
+                    data, svd_rank=self._svd_rank
+                )
         # If not using a global svd or a specified svd_rank, local u from
         # each window is used instead. The optimal svd_rank may change when
         # using the locally optimal svd_rank. To deal with this situation in
@@ -524,13 +678,13 @@ class COSTS:
         self._time_array = np.zeros((self._n_slides, self._window_length))
         self._modes_array = np.zeros(
             (self._n_slides, self._n_data_vars, self._svd_rank_pre_allocate),
-            np.complex128,
+            complex_dtype,
         )
         self._omega_array = np.zeros(
-            (self._n_slides, self._svd_rank_pre_allocate), np.complex128
+            (self._n_slides, self._svd_rank_pre_allocate), complex_dtype
         )
         self._amplitudes_array = np.zeros(
-            (self._n_slides, self._svd_rank_pre_allocate), np.complex128
+            (self._n_slides, self._svd_rank_pre_allocate), complex_dtype
         )
         self._window_means_array = np.zeros((self._n_slides, self._n_data_vars))
 
@@ -552,31 +706,181 @@ class COSTS:
         )
 
         # Perform the sliding window DMD fitting.
-        for k in range(self._n_slides):
+        data = np.asarray(data)
+        if n_jobs == 1:
+            self._fit_windows(
+                optdmd,
+                range(self._n_slides),
+                data,
+                time,
+                lv_kern,
+                verbose=verbose,
+            )
+        else:
+            # The first window is fit on its own since BOPDMD keeps the
+            # initial eigenvalues it finds and uses them for all later
+            # windows. Each thread then fits a contiguous block of the
+            # remaining windows with its own copy of the fitted BOPDMD object.
+            # LAPACK releases the GIL, so the threads run concurrently.
+            self._fit_windows(
+                optdmd, range(1), data, time, lv_kern, verbose=verbose
+            )
+            blocks = np.array_split(np.arange(1, self._n_slides), n_jobs)
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [
+                    executor.submit(
+                        self._fit_windows,
+                        copy.deepcopy(optdmd),
+                        block,
+                        data,
+                        time,
+                        lv_kern,
+                        verbose=verbose,
+                    )
+                    for block in blocks
+                    if block.size
+                ]
+                for future in futures:
+                    future.result()
+
+    def _prepare_windows(self, data, slides, lv_kern):
+        """Subtract the time mean from a batch of windows and kern them.
+
+        Helper function for `fit`, which also stores the window means.
+
+        :param data: 1D snapshots for fitting.
+        :type data: numpy.ndarray
+        :param slides: Indices of the windows to prepare.
+        :type slides: iterable of ints
+        :param lv_kern: Kernel for rounding the corners of the windows.
+        :type lv_kern: numpy.ndarray
+        :return: Mean-subtracted and kerned windows with dimensions of
+            n_windows x n_data_vars x window_length.
+        :rtype: numpy.ndarray
+        """
+        slides = np.asarray(slides)
+        windows = data[:, self._window_indices[slides]].transpose(1, 0, 2)
+
+        # Subtract off the time mean before rounding corners.
+        c = windows.mean(axis=2, keepdims=True)
+        self._window_means_array[slides] = c[:, :, 0]
+
+        # Round the corners of the windows. The kernel is applied in place on
+        # the mean-subtracted windows to avoid another array.
+        data_windows = windows - c
+        data_windows *= lv_kern
+        return data_windows
+
+    def _fit_windows(
+        self,
+        optdmd,
+        slides,
+        data,
+        time,
+        lv_kern,
+        verbose=False,
+    ):
+        """Fit BOPDMD to a sequence of windows.
+
+        Helper function for `fit`, which assigns the results of each window
+        to the pre-allocated arrays. The windows are prepared in batches of at
+        most `_CHUNK_ELEMENTS` elements, so the memory does not grow with the
+        number of windows.
+
+        :param optdmd: BOPDMD object used to fit the windows in sequence.
+        :type optdmd: pydmd.BOPDMD
+        :param slides: Indices of the windows to fit.
+        :type slides: iterable of ints
+        :param data: 1D snapshots for fitting.
+        :type data: numpy.ndarray
+        :param time: time series labeling the 1D snapshots
+        :type time: numpy.ndarray
+        :param lv_kern: Kernel for rounding the corners of the windows.
+        :type lv_kern: numpy.ndarray
+        :param verbose: notifies progress for fitting. Default is False.
+        :type verbose: bool
+        """
+        slides = np.asarray(slides)
+        chunk_size = max(
+            1,
+            self._CHUNK_ELEMENTS // (self._n_data_vars * self._window_length),
+        )
+        for start in range(0, slides.size, chunk_size):
+            batch = slides[start : start + chunk_size]
+            data_windows = self._prepare_windows(data, batch, lv_kern)
+            # Every window has the same shape, so the singular values for the
+            # local rank truncation are computed for the batch in one svd
+            # call.
+            if not self._global_svd:
+                window_singular_values = np.linalg.svd(
+                    data_windows, compute_uv=False
+                )
+            else:
+                window_singular_values = None
+            self._fit_window_batch(
+                optdmd,
+                batch,
+                data_windows,
+                time,
+                window_singular_values=window_singular_values,
+                verbose=verbose,
+            )
+
+    def _fit_window_batch(
+        self,
+        optdmd,
+        slides,
+        data_windows,
+        time,
+        window_singular_values=None,
+        verbose=False,
+    ):
+        """Fit BOPDMD to a batch of prepared windows.
+
+        Helper function for `_fit_windows`.
+
+        :param optdmd: BOPDMD object used to fit the windows in sequence.
+        :type optdmd: pydmd.BOPDMD
+        :param slides: Indices of the windows to fit.
+        :type slides: numpy.ndarray
+        :param data_windows: Mean-subtracted and kerned data of the windows in
+            `slides`.
+        :type data_windows: numpy.ndarray
+        :param time: time series labeling the 1D snapshots
+        :type time: numpy.ndarray
+        :param window_singular_values: Singular values of each window in
+            `slides` for the local rank truncation. Only used when
+            `global_svd` is False.
+        :type window_singular_values: numpy.ndarray or NoneType
+        :param verbose: notifies progress for fitting. Default is False.
+        :type verbose: bool
+        """
+        window_slices = self._window_slices
+        # BOPDMD copies the time it is given, so the shifted time of every
+        # window can share one buffer.
+        time_window = np.empty((time.shape[0], self._window_length))
+        for i, k in enumerate(slides):
             if verbose and k % 50 == 0:
                 print(f"{k:} of {self._n_slides:}")
 
-            sample_slice = self.get_window_indices(k)
-            data_window = data[:, sample_slice]
-            original_time_window = time[:, sample_slice]
+            data_window = data_windows[i]
+            original_time_window = time[:, window_slices[k]]
 
             # All windows are fit with the time array reset to start at t=0.
             t_start = original_time_window[:, 0]
-            time_window = original_time_window - t_start
-
-            # Subtract off the time mean before rounding corners.
-            c = np.mean(data_window, 1, keepdims=True)
-            data_window = data_window - c
-
-            # Round the corners of the window.
-            data_window = data_window * lv_kern
+            np.subtract(original_time_window, t_start, out=time_window)
 
             # Reset optdmd between iterations
             if not self._global_svd:
                 # Get the svd rank for this window. Uses rank truncation when
                 # svd_rank is not fixed, i.e. svd_rank = 0, otherwise uses the
                 # specified rank.
-                _svd_rank = compute_rank(data_window, svd_rank=self._svd_rank)
+                _svd_rank = _compute_rank(
+                    window_singular_values[i],
+                    self._n_data_vars,
+                    self._window_length,
+                    self._svd_rank,
+                )
                 # Force svd rank to be even to allow for conjugate pairs.
                 if self._force_even_eigs and _svd_rank % 2:
                     _svd_rank += 1
@@ -590,13 +894,14 @@ class COSTS:
             # Fit the window using the optDMD.
             optdmd.fit(data_window, time_window)
 
-            # Assign the results from this window.
-            self._modes_array[k, :, : optdmd.modes.shape[-1]] = optdmd.modes
-            self._omega_array[k, : optdmd.eigs.shape[0]] = optdmd.eigs
-            self._amplitudes_array[k, : optdmd.eigs.shape[0]] = (
-                optdmd.amplitudes
-            )
-            self._window_means_array[k] = c.flatten()
+            # Assign the results from this window. The fitted properties are
+            # evaluated once and copied straight into the (C-ordered, hence
+            # contiguous per window) pre-allocated arrays.
+            modes, eigs = optdmd.modes, optdmd.eigs
+            n_eigs = eigs.shape[0]
+            np.copyto(self._modes_array[k, :, : modes.shape[-1]], modes)
+            np.copyto(self._omega_array[k, :n_eigs], eigs)
+            np.copyto(self._amplitudes_array[k, :n_eigs], optdmd.amplitudes)
             self._time_array[k] = original_time_window
 
             # Reset optdmd between iterations
@@ -613,22 +918,50 @@ class COSTS:
                 elif self._reset_alpha_init:
                     optdmd.init_alpha = None
 
+    def _invalidate_caches(self, omega=True):
+        """Discard results cached from a previous fit or clustering.
+
+        :param omega: Whether omega changed, which also discards the cached
+            omega transforms.
+        :type omega: bool
+        """
+        self._scale_recon_cache = {}
+        if omega:
+            self._omega_transform_cache = {}
+
+    def _build_window_indices(self):
+        """Precompute the time indices of every window.
+
+        Handles non-integer number of slides by making the last window span
+        the final `window_length` time steps. Stores the start and stop
+        indices, a slice per window, and the full n_slides x window_length
+        array of time indices.
+        """
+        starts = np.arange(self._n_slides) * self._step_size
+        if self._non_integer_n_slide:
+            starts[-1] = self._n_time_steps - self._window_length
+        self._window_starts = starts
+        self._window_stops = starts + self._window_length
+        self._window_indices = starts[:, np.newaxis] + np.arange(
+            self._window_length
+        )
+        self._window_slices = [
+            slice(start, stop)
+            for start, stop in zip(starts.tolist(), self._window_stops.tolist())
+        ]
+
     def get_window_indices(self, k):
         """Returns the window indices for slide `k`.
 
         Handles non-integer number of slides by making the last slide
-        correspond to `slice(-window_length, None)`.
+        correspond to the final `window_length` time steps.
 
         :param k: Window to index
         :type k: int
         :return: slice indexing the given window
         :rtype: slice
         """
-        # Get the window indices and data.
-        sample_start = self._step_size * k
-        if k == self._n_slides - 1 and self._non_integer_n_slide:
-            return slice(-self._window_length, None)
-        return slice(sample_start, sample_start + self._window_length)
+        return self._window_slices[k]
 
     def cluster_omega(
         self,
@@ -646,14 +979,14 @@ class COSTS:
             clusters.
         :type n_components: int
         :param kmeans_kwargs: Arguments for KMeans clustering. The default is
-            random_state = 0.
+            random_state = 0. Must be None when `method` is None.
         :type kmeans_kwargs: dict
         :param transform_method: How to transform omega. See docstring for
             valid options.
         :type transform_method: str or NoneType
         :param method: Clustering method following the sklearn pattern (has
             `fit_predict` and `n_clusters` keywords). Default is
-            MiniBatchKMeans.
+            MiniBatchKMeans. None uses the 1D k-means of `_cluster_1d`.
         :type method: method
         """
 
@@ -669,6 +1002,8 @@ class COSTS:
         self._omega_classes = omega_classes
         self._transform_method = transform_method
         self._n_components = n_components
+        # The omega transforms do not depend on the clustering.
+        self._invalidate_caches(omega=False)
 
     def _cluster(
         self,
@@ -676,6 +1011,7 @@ class COSTS:
         kmeans_kwargs=None,
         transform_method=None,
         method=MiniBatchKMeans,
+        omega_transform=None,
     ):
         """Clusters fitted eigenvalues into frequency bands by the imaginary
         component.
@@ -686,15 +1022,18 @@ class COSTS:
             clusters.
         :type n_components: int
         :param kmeans_kwargs: Arguments for KMeans clustering. The default is
-            random_state = 0.
+            random_state = 0. Must be None when `method` is None.
         :type kmeans_kwargs: dict or NoneType
         :param transform_method: How to transform omega. See docstring for
             valid options.
         :type transform_method: str or NoneType
         :param method: Clustering method following the sklearn pattern (has
             `fit_predict` and `n_clusters` keywords). Default is
-            MiniBatchKMeans.
+            MiniBatchKMeans. None uses the 1D k-means of `_cluster_1d`.
         :type method: method
+        :param omega_transform: Flattened omega already transformed with
+            `transform_method`. Computed from `omega_array` if None.
+        :type omega_transform: numpy.ndarray or NoneType
         :return omega_classes: Classes defining the frequency bands ordered
             from the largest frequency to the smallest frequency.
         :rtype omega_classes: numpy.ndarray
@@ -702,43 +1041,164 @@ class COSTS:
             corresponds to the classes.
         :rtype cluster_centroids: numpy.ndarray
         """
+        if method is None and kmeans_kwargs:
+            raise ValueError(
+                "kmeans_kwargs are not used by the 1D k-means (method=None)."
+            )
         if kmeans_kwargs is None:
             kmeans_kwargs = {}
             random_state = 0
             kmeans_kwargs["random_state"] = kmeans_kwargs.get(
                 "random_state", random_state
             )
-        if not hasattr(method, "fit_predict") and callable(
-            getattr(method, "fit_predict")
-        ):
-            raise ValueError(
-                "Clustering method must have `fit_predict()` method."
+
+        if omega_transform is None:
+            # Reshape the omega array into a 1d array
+            omega_rshp = self.omega_array.reshape(
+                self._n_slides * self._svd_rank_pre_allocate
+            )
+            omega_transform = self.transform_omega(
+                omega_rshp, transform_method=transform_method
             )
-        clustering = method(n_clusters=n_components, **kmeans_kwargs)
 
-        # Reshape the omega array into a 1d array
-        omega_rshp = self.omega_array.reshape(
-            self._n_slides * self._svd_rank_pre_allocate
-        )
-        omega_transform = self.transform_omega(
-            omega_rshp, transform_method=transform_method
-        )
+        if method is None:
+            cluster_centroids, omega_classes = self._cluster_1d(
+                omega_transform, n_components
+            )
+        else:
+            if not callable(getattr(method, "fit_predict", None)):
+                raise ValueError(
+                    "Clustering method must have `fit_predict()` method."
+                )
+            clustering = method(n_clusters=n_components, **kmeans_kwargs)
+            omega_classes = clustering.fit_predict(
+                np.atleast_2d(omega_transform).T
+            )
+            cluster_centroids = clustering.cluster_centers_.ravel()
 
-        omega_classes = clustering.fit_predict(np.atleast_2d(omega_transform).T)
         omega_classes = omega_classes.reshape(
             self._n_slides, self._svd_rank_pre_allocate
         )
-        cluster_centroids = clustering.cluster_centers_.flatten()
 
         # Sort the clusters by the centroid magnitude.
         idx = np.argsort(cluster_centroids)
-        lut = np.zeros_like(idx)
-        lut[idx] = np.arange(n_components)
+        # The inverse permutation maps the old classes to the sorted classes.
+        lut = np.argsort(idx)
         omega_classes = lut[omega_classes]
         cluster_centroids = cluster_centroids[idx]
 
         return cluster_centroids, omega_classes
 
+    @staticmethod
+    def _silhouette_score_1d(x, labels, sample_size=None, random_state=0):
+        """Exact mean silhouette coefficient of a clustering of 1D data.
+
+        Equivalent to `sklearn.metrics.silhouette_score` with the euclidean
+        metric, but avoids the O(n^2) pairwise distances. In 1D the summed
+        distance from a point to all members of a cluster follows from the
+        sorted cluster members and their cumulative sum, giving O(k n log n)
+        work and O(k n) memory for k clusters.
+
+        :param x: 1D array of clustered values.
+        :type x: numpy.ndarray
+        :param labels: Cluster label of each value in `x`.
+        :type labels: numpy.ndarray
+        :param sample_size: Number of randomly drawn values to score, as in
+            `sklearn.metrics.silhouette_score`. Default is None, which scores
+            all values.
+        :type sample_size: int or NoneType
+        :param random_state: Seed for drawing the sample.
+        :type random_state: int or NoneType
+        :return: Mean silhouette coefficient over all (or the sampled) values.
+        :rtype: float
+        """
+        # The cumulative sums lose precision in single precision, so the
+        # distances are accumulated in double precision.
+        x = np.ravel(x).astype(np.float64, copy=False)
+        labels = np.ravel(labels)
+        if sample_size is not None and sample_size < x.size:
+            sample = np.random.default_rng(random_state).choice(
+                x.size, sample_size, replace=False
+            )
+            x, labels = x[sample], labels[sample]
+        _, labels, counts = np.unique(
+            labels, return_inverse=True, return_counts=True
+        )
+        n_labels = counts.size
+        if not 1 < n_labels < x.size:
+            raise ValueError(
+                f"Number of labels is {n_labels:}. Valid values are 2 to "
+                "n_samples - 1 (inclusive)"
+            )
+
+        # Summed distance from every value to the members of each cluster.
+        distance_sums = np.empty((x.size, n_labels))
+        for c in range(n_labels):
+            members = np.sort(x[labels == c])
+            cumulative_sum = np.concatenate(([0], np.cumsum(members)))
+            n_below = np.searchsorted(members, x)
+            sum_below = cumulative_sum[n_below]
+            distance_sums[:, c] = (
+                x * n_below
+                - sum_below
+                + (cumulative_sum[-1] - sum_below)
+                - x * (counts[c] - n_below)
+            )
+
+        own = np.arange(x.size)
+        own_counts = counts[labels]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Mean intra-cluster distance, excluding the value itself.
+            a = distance_sums[own, labels] / (own_counts - 1)
+            # Mean distance to the nearest other cluster.
+            mean_distances = distance_sums / counts
+            mean_distances[own, labels] = np.inf
+            b = mean_distances.min(axis=1)
+            silhouette = (b - a) / np.maximum(a, b)
+        # Values in singleton clusters have a silhouette of zero.
+        silhouette[own_counts == 1] = 0
+        return np.mean(np.nan_to_num(silhouette))
+
+    @staticmethod
+    def _cluster_1d(x, n_components, max_iter=300):
+        """K-means clustering specialized to 1D data.
+
+        Centroids are seeded at evenly spaced quantiles of `x` and refined
+        with Lloyd iterations. In 1D the centroids stay ordered, so each
+        assignment step is a binary search against the midpoints between
+        neighboring centroids. The result is deterministic but, like
+        MiniBatchKMeans, only a local optimum.
+
+        :param x: 1D array of values to cluster.
+        :type x: numpy.ndarray
+        :param n_components: Number of clusters.
+        :type n_components: int
+        :param max_iter: Maximum number of Lloyd iterations.
+        :type max_iter: int
+        :return cluster_centroids: Centroids of the clusters, sorted in
+            ascending order.
+        :rtype cluster_centroids: numpy.ndarray
+        :return labels: Cluster index of each value in `x`.
+        :rtype labels: numpy.ndarray
+        """
+        cluster_centroids = np.quantile(
+            x, (np.arange(n_components) + 0.5) / n_components
+        )
+        labels = None
+        for _ in range(max_iter):
+            boundaries = 0.5 * (cluster_centroids[1:] + cluster_centroids[:-1])
+            new_labels = np.searchsorted(boundaries, x)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+            counts = np.bincount(labels, minlength=n_components)
+            sums = np.bincount(labels, weights=x, minlength=n_components)
+            # Empty clusters keep their previous centroid.
+            populated = counts > 0
+            cluster_centroids[populated] = sums[populated] / counts[populated]
+
+        return cluster_centroids, labels
+
     def transform_omega(self, omega_array, transform_method="absolute"):
         """Transform omega, primarily for clustering.
         Options for transforming omega are:
@@ -749,31 +1209,67 @@ class COSTS:
         Default value is "absolute". All transformations and clustering are
         performed on the imaginary portion of omega.
 
+        Transformations of (views of) the fitted `omega_array` are cached
+        until the next fit or clustering and returned read-only.
+
         :param omega_array:
         :param transform_method:
         :return: transformed omega array
         :rtype: numpy.ndarray
         """
+        # Only views of the fitted omega are cached. Views sharing the buffer
+        # (e.g. a transpose) are told apart by their shape and strides.
+        cache_key = None
+        if (
+            self._omega_array is not None
+            and omega_array.dtype == self._omega_array.dtype
+            and omega_array.size == self._omega_array.size
+            and omega_array.ctypes.data == self._omega_array.ctypes.data
+        ):
+            cache_key = (
+                transform_method,
+                omega_array.shape,
+                omega_array.strides,
+            )
+            if cache_key in self._omega_transform_cache:
+                (
+                    omega_transform,
+                    self._omega_label,
+                    self._hist_kwargs,
+                ) = self._omega_transform_cache[cache_key]
+                return omega_transform
+
+        # The imaginary part is used in its own precision without a copy,
+        # only non-floating types are cast to float64.
+        omega_imag = omega_array.imag
+        omega_imag = omega_imag.astype(
+            np.result_type(omega_imag.dtype, np.float32), copy=False
+        )
+
         # Apply a transformation to omega to improve frequency band separation
         if transform_method == "absolute":
-            omega_transform = np.abs(omega_array.imag.astype("float"))
+            omega_transform = np.abs(omega_imag)
             self._omega_label = r"$|\omega|$"
             self._hist_kwargs = {"bins": 64}
         # Outstanding question: should this be the complex conjugate or
         # the imaginary component squared?
         elif transform_method == "square_frequencies":
-            omega_transform = (omega_array.imag**2).real.astype("float")
+            omega_transform = np.square(omega_imag)
             self._omega_label = r"$|\omega|^{2}$"
             self._hist_kwargs = {"bins": 64}
         elif transform_method == "log10":
-            omega_transform = np.log10(np.abs(omega_array.imag.astype("float")))
+            omega_transform = np.abs(omega_imag)
+            nonzero = omega_transform > 0
+            np.log10(omega_transform, where=nonzero, out=omega_transform)
             # Impute log10(0) with the smallest non-zero values in log10(omega).
-            zero_imputer = omega_transform[np.isfinite(omega_transform)].min()
-            omega_transform[~np.isfinite(omega_transform)] = zero_imputer
+            omega_transform[~nonzero] = (
+                omega_transform[nonzero].min() if nonzero.any() else 0.0
+            )
             self._omega_label = r"$log_{10}(|\omega|)$"
             self._hist_kwargs = {"bins": 64}
         elif transform_method == "period":
-            omega_transform = 1 / np.abs(omega_array.imag.astype("float"))
+            omega_transform = np.abs(omega_imag)
+            np.reciprocal(omega_transform, out=omega_transform)
             self._omega_label = "Period"
             self._hist_kwargs = {"bins": 64}
         else:
@@ -781,6 +1277,14 @@ class COSTS:
                 f"Transform method {transform_method:} not supported."
             )
 
+        if cache_key is not None:
+            omega_transform.flags.writeable = False
+            self._omega_transform_cache[cache_key] = (
+                omega_transform,
+                self._omega_label,
+                self._hist_kwargs,
+            )
+
         return omega_transform
 
     def cluster_hyperparameter_sweep(
@@ -789,13 +1293,16 @@ class COSTS:
         transform_method=None,
         method=MiniBatchKMeans,
         clustering_kwargs=None,
+        n_jobs=None,
+        sample_size=None,
     ):
         """Hyperparameter search for number of frequency bands.
 
         Searches for the optimal number of clusters to use in kmeans clustering
         separation of the frequency bands. To best separate frequency bands
         it may be necessary to transform omega. Scores clusters using the
-        silhouette score which can be slow to compute.
+        silhouette score, computed exactly with a method specialized to the
+        1D transformed omega.
 
         Options for transforming omega are:
             "period": :math:`\\frac{1}{\\omega}`
@@ -812,10 +1319,19 @@ class COSTS:
         :type transform_method: str
         :param method: Clustering method following the sklearn pattern (has
             `fit_predict` and `n_clusters` keywords). Default is
-            MiniBatchKMeans.
+            MiniBatchKMeans. None uses the 1D k-means of `_cluster_1d`.
         :param clustering_kwargs: keywords to give to the clustering method.
         :type clustering_kwargs: dict
         :type method: method
+        :param n_jobs: Number of threads for evaluating the values of
+            `n_components_range` in parallel. -1 uses all processors. Default
+            is None, which evaluates them sequentially.
+        :type n_jobs: int or NoneType
+        :param sample_size: Number of randomly drawn eigenvalues used for the
+            silhouette score, see `sklearn.metrics.silhouette_score`. The
+            same sample is scored for every value of `n_components_range`.
+            Default is None, which scores all eigenvalues exactly.
+        :type sample_size: int or NoneType
         :return: optimal value of `n_components` for clustering.
         """
         if n_components_range is None:
@@ -823,8 +1339,6 @@ class COSTS:
                 np.max((self.svd_rank // 4, 2)),
                 self.svd_rank // 2 + 1,
             )
-        score = np.zeros_like(n_components_range, float)
-
         # Reshape the omega array into a 1d array. This is done here and not
         # in the _cluster() helper to reduce the number of times the variable
         # is computed.
@@ -836,22 +1350,25 @@ class COSTS:
             omega_rshp, transform_method=transform_method
         )
 
-        for nind, n in enumerate(n_components_range):
+        def sweep_score(n):
             _, omega_classes = self._cluster(
                 n_components=n,
                 transform_method=transform_method,
                 kmeans_kwargs=clustering_kwargs,
                 method=method,
+                omega_transform=omega_transform,
             )
-
-            classes_reshape = omega_classes.reshape(
-                self._n_slides * self._svd_rank_pre_allocate
+            return self._silhouette_score_1d(
+                omega_transform, omega_classes, sample_size=sample_size
             )
 
-            score[nind] = silhouette_score(
-                np.atleast_2d(omega_transform).T,
-                np.atleast_2d(classes_reshape).T,
-            )
+        # Each value of n_components is clustered and scored independently.
+        n_jobs = self._n_threads(n_jobs)
+        if n_jobs == 1:
+            score = [sweep_score(n) for n in n_components_range]
+        else:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                score = list(executor.map(sweep_score, n_components_range))
 
         return n_components_range[np.argmax(score)]
 
@@ -868,7 +1385,8 @@ class COSTS:
 
         # Apply the transformation to omega
         omega_transform = self.transform_omega(
-            self.omega_array.flatten(), transform_method=self._transform_method
+            self.omega_array.ravel(),
+            transform_method=self._transform_method,
         )
 
         label = self._omega_label
@@ -902,21 +1420,27 @@ class COSTS:
 
         # Apply the transformation to omega
         omega_transform = self.transform_omega(
-            self.omega_array.flatten(), transform_method=self._transform_method
+            self.omega_array.ravel(),
+            transform_method=self._transform_method,
         )
 
         label = self._omega_label
 
-        for ncomponent, component in enumerate(range(self._n_components)):
+        # Mask the transformed omega of every frequency band at once.
+        components = np.arange(self._n_components)
+        omega_components = np.where(
+            self._omega_classes == components[:, np.newaxis, np.newaxis],
+            omega_transform.reshape(
+                (1, self._n_slides, self._svd_rank_pre_allocate)
+            ),
+            np.nan,
+        )
+        window_time_means = np.mean(self.time_array, axis=1)
+
+        for ncomponent in components:
             ax.plot(
-                np.mean(self.time_array, axis=1),
-                np.where(
-                    self._omega_classes == component,
-                    omega_transform.reshape(
-                        (self._n_slides, self._svd_rank_pre_allocate)
-                    ),
-                    np.nan,
-                ),
+                window_time_means,
+                omega_components[ncomponent],
                 color=colors[ncomponent % len(colors)],
                 ls="None",
                 marker=".",
@@ -938,7 +1462,7 @@ class COSTS:
         """
         if scale_reconstruction_kwargs is None:
             scale_reconstruction_kwargs = {}
-        xr_sep = self.scale_reconstruction(**scale_reconstruction_kwargs)
+        xr_sep = self._scale_reconstruction(**scale_reconstruction_kwargs)
         x_global_recon = xr_sep.sum(axis=0)
         return x_global_recon
 
@@ -954,65 +1478,125 @@ class COSTS:
         and end of time series prone to larger errors. A best practice is
         to cut off `window_length` from each end before further analysis.
 
+        With `cache_reconstruction`, the reconstruction is cached until the
+        next fit or clustering and repeated calls only copy it.
+
+        The windows are reconstructed in batches, trading the speed of large
+        batched matrix products against the memory of the per-window
+        intermediates. Besides the returned array, the memory is bounded by
+        a few arrays of `_CHUNK_ELEMENTS` elements.
+
         :param include_means: Not API stable
         :return: Reconstruction for each frequency band with dimensions of:
-            n_components x n_data_vars x n_time_steps
+            n_components x n_data_vars x n_time_steps. The precision follows
+            the fitted modes, i.e. float32 for a single precision fit.
         :rtype: numpy.ndarray
         """
+        xr_sep = self._scale_reconstruction(include_means=include_means)
+        # The cached reconstruction is shared, so callers get a copy of it.
+        if self._cache_reconstruction:
+            return xr_sep.copy()
+        return xr_sep
+
+    def _scale_reconstruction(self, include_means=True):
+        """Scale reconstruction for the methods that only read it.
+
+        See `scale_reconstruction` for the details.
+
+        :param include_means: Not API stable
+        :return: Reconstruction for each frequency band with dimensions of:
+            n_components x n_data_vars x n_time_steps. The cached
+            reconstruction is read-only.
+        :rtype: numpy.ndarray
+        """
+        if include_means in self._scale_recon_cache:
+            return self._scale_recon_cache[include_means]
+
+        # Use the precision of the fit throughout the reconstruction.
+        real_dtype = self._modes_array.real.dtype
 
         # Each individual reconstructed window
         xr_sep = np.zeros(
-            (self._n_components, self._n_data_vars, self._n_time_steps)
+            (self._n_components, self._n_data_vars, self._n_time_steps),
+            dtype=real_dtype,
         )
 
-        # Track the total contribution from all windows to each time step
-        xn = np.zeros(self._n_time_steps)
-
         # Convolve each windowed reconstruction with a gaussian filter.
         # Weights points in the middle of the window and de-emphasizes the
         # edges of the window.
         recon_filter = self.build_kern(self._window_length)
 
-        for k in range(self._n_slides):
-            window_indices = self.get_window_indices(k)
-
-            w = self._modes_array[k]
-            b = self._amplitudes_array[k]
-            omega = copy.deepcopy(np.atleast_2d(self._omega_array[k]).T)
-            classification = self._omega_classes[k]
-
-            c = np.atleast_2d(self._window_means_array[k]).T
+        # Compute each segment of the reconstructed data starting at "t = 0".
+        t = self._time_array - self._time_array.min(axis=1, keepdims=True)
+        t = t.astype(real_dtype, copy=False)
 
-            # Compute each segment of the reconstructed data starting at "t = 0"
-            t = self._time_array[k]
-            t_start = t.min()
-            t = t - t_start
-
-            xr_sep_window = np.zeros(
-                (self._n_components, self._n_data_vars, self._window_length)
+        window_slices = self._window_slices
+        lowest_frequency_band = np.argmin(self._cluster_centroids)
+        # The masks of every frequency band, built in one comparison.
+        class_masks = (
+            self._omega_classes
+            == np.arange(self._n_components)[:, np.newaxis, np.newaxis]
+        )
+        # Frequency bands without any eigenvalues in the whole fit are not
+        # reconstructed. This is decided over all windows, not per batch, so
+        # that the means are added to every window of the lowest band.
+        populated_bands = class_masks.any(axis=(1, 2))
+        # Number of windows per batch, such that the batched dynamics and
+        # reconstructions stay below the chunk size.
+        chunk_size = max(
+            1,
+            self._CHUNK_ELEMENTS
+            // (
+                self._window_length
+                * max(self._svd_rank_pre_allocate, self._n_data_vars)
+            ),
+        )
+        for start in range(0, self._n_slides, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            # The time dynamics scaled by the amplitudes are evaluated for
+            # the batch of windows with dimensions of
+            # chunk_size x svd_rank x window_length.
+            dynamics = np.exp(
+                self._omega_array[chunk, :, np.newaxis] * t[chunk, np.newaxis]
             )
-            for j in np.unique(self._omega_classes):
-                class_index = classification == j
-                xr_sep_window[j] = np.linalg.multi_dot(
-                    [
-                        w[:, class_index],
-                        np.diag(b[class_index]),
-                        np.exp(omega[class_index] * t),
-                    ]
+            dynamics *= self._amplitudes_array[chunk, :, np.newaxis]
+
+            for j, class_mask in enumerate(class_masks[:, chunk]):
+                if not populated_bands[j]:
+                    continue
+                # One batched matrix product reconstructs this frequency band
+                # for the batch of windows, with the eigenvalues of other
+                # bands masked out.
+                xr_sep_windows = np.matmul(
+                    self._modes_array[chunk],
+                    dynamics * class_mask[:, :, np.newaxis],
                 ).real
 
                 # Add the constant offset to the lowest frequency cluster.
-                if include_means and j == np.argmin(self._cluster_centroids):
-                    xr_sep_window[j] += c
-                xr_sep_window[j] = xr_sep_window[j] * recon_filter
+                if include_means and j == lowest_frequency_band:
+                    xr_sep_windows += self._window_means_array[
+                        chunk, :, np.newaxis
+                    ]
+                xr_sep_windows *= recon_filter
 
-                xr_sep[j, :, window_indices] = (
-                    xr_sep[j, :, window_indices] + xr_sep_window[j]
-                )
+                for k, xr_sep_window in enumerate(xr_sep_windows, start):
+                    xr_sep[j, :, window_slices[k]] += xr_sep_window
 
-            xn[window_indices] += recon_filter
+        # The filter weights do not depend on the frequency band, so their
+        # overlapping sum is accumulated for all windows in one pass.
+        xn = np.bincount(
+            self._window_indices.ravel(),
+            weights=np.tile(recon_filter, self._n_slides),
+            minlength=self._n_time_steps,
+        )
 
-        xr_sep = xr_sep / xn
+        # Normalize by the total contribution from all windows to each time
+        # step.
+        xr_sep /= xn
+        if self._cache_reconstruction:
+            xr_sep.flags.writeable = False
+            # Only the latest reconstruction is kept to bound the memory.
+            self._scale_recon_cache = {include_means: xr_sep}
 
         return xr_sep
 
@@ -1039,8 +1623,8 @@ class COSTS:
         if scale_reconstruction_kwargs is None:
             scale_reconstruction_kwargs = {}
 
-        xr_sep = self.scale_reconstruction(**scale_reconstruction_kwargs)
-        xr_low_frequency = xr_sep[0]
+        xr_sep = self._scale_reconstruction(**scale_reconstruction_kwargs)
+        xr_low_frequency = xr_sep[0].copy()
         xr_high_frequency = xr_sep[1:].sum(axis=0)
 
         return xr_low_frequency, xr_high_frequency
@@ -1192,7 +1776,7 @@ class COSTS:
         if scale_reconstruction_kwargs is None:
             scale_reconstruction_kwargs = {}
 
-        xr_sep = self.scale_reconstruction(**scale_reconstruction_kwargs)
+        xr_sep = self._scale_reconstruction(**scale_reconstruction_kwargs)
 
         if fig_kwargs is None:
             fig_kwargs = {}
@@ -1355,7 +1939,7 @@ class COSTS:
 
         if scale_reconstruction_kwargs is None:
             scale_reconstruction_kwargs = {}
-        xr_sep = self.scale_reconstruction(**scale_reconstruction_kwargs)
+        xr_sep = self._scale_reconstruction(**scale_reconstruction_kwargs)
 
         fig, axes = plt.subplots(
             nrows=self.n_components + 2,
@@ -1446,6 +2030,9 @@ class COSTS:
         The functions `to_xarray` and `from_xarray` should allow for a complete
         round trip of the COSTS object without alteration.
 
+        The variables of the Dataset are views of the fitted arrays, so no
+        copies are made.
+
         :return: COSTS fit in xarray format
         :rtype: xarray.Dataset
         """
@@ -1485,24 +2072,41 @@ class COSTS:
                     self.time_array,
                 ),
             },
-            attrs={
-                "svd_rank": self.svd_rank,
-                "omega_transformation": self._xarray_sanitize(
+            attrs=dict(
+                zip(
+                    self._ATTR_KEYS,
+                    (
+                        self.svd_rank,
+                        self._n_slides,
+                        self._window_length,
+                        self.n_components,
+                        self._n_data_vars,
+                        self._n_time_steps,
+                        self._step_size,
+                        self._non_integer_n_slide,
+                        self._global_svd,
+                    ),
+                ),
+                omega_transformation=self._xarray_sanitize(
                     self._transform_method
                 ),
-                "n_slides": self._n_slides,
-                "window_length": self._window_length,
-                "num_frequency_bands": self.n_components,
-                "n_data_vars": self._n_data_vars,
-                "n_time_steps": self._n_time_steps,
-                "step_size": self._step_size,
-                "non_integer_n_slide": self._non_integer_n_slide,
-                "global_svd": self._global_svd,
-            },
+            ),
         )
 
+        # The pydmd_kwargs are stored as a single JSON attribute. Arrays
+        # (e.g., `proj_basis`) are natively supported by netcdf and keep an
+        # attribute of their own.
+        json_kwargs = {}
+        kwargs_attrs = {}
         for kw, kw_val in self._pydmd_kwargs.items():
-            ds.attrs[f"pydmd_kwargs__{kw}"] = self._xarray_sanitize(kw_val)
+            if isinstance(kw_val, np.ndarray):
+                kwargs_attrs["pydmd_kwargs__" + kw] = kw_val
+            else:
+                json_kwargs[kw] = self._xarray_sanitize(kw_val)
+        kwargs_attrs["pydmd_kwargs_json"] = json.dumps(
+            json_kwargs, default=self._json_default
+        )
+        ds.attrs.update(kwargs_attrs)
 
         return ds
 
@@ -1515,36 +2119,58 @@ class COSTS:
         :return: Previously fitted COSTS object.
         """
 
-        self._omega_array = ds.omega.values
-        self._omega_classes = ds.omega_classes.values
-        self._amplitudes_array = ds.amplitudes.values
-        self._modes_array = ds.modes.values
-        self._window_means_array = ds.window_means.values
-        self._cluster_centroids = ds.cluster_centroids.values
-        self._time_array = ds.time.values
-        self._n_slides = ds.attrs["n_slides"]
-        self._svd_rank = ds.attrs["svd_rank"]
-        self._n_data_vars = ds.attrs["n_data_vars"]
-        self._n_time_steps = ds.attrs["n_time_steps"]
-        self._n_components = ds.attrs["num_frequency_bands"]
-        self._non_integer_n_slide = ds.attrs["non_integer_n_slide"]
-        self._step_size = ds.attrs["step_size"]
-        self._window_length = ds.attrs["window_length"]
-        self._global_svd = ds.attrs["global_svd"]
+        # Load lazily backed Datasets (e.g., opened from file) in one pass.
+        # Afterwards the variables are backed by numpy arrays that are used
+        # without a copy.
+        ds = ds.load()
+
+        # The per-window arrays are indexed by slide in the reconstructions, so
+        # keep them C-contiguous regardless of how the Dataset was stored.
+        self._omega_array = np.ascontiguousarray(ds["omega"].data)
+        self._omega_classes = np.ascontiguousarray(ds["omega_classes"].data)
+        self._amplitudes_array = np.ascontiguousarray(ds["amplitudes"].data)
+        self._modes_array = np.ascontiguousarray(ds["modes"].data)
+        self._window_means_array = np.ascontiguousarray(ds["window_means"].data)
+        self._cluster_centroids = np.asarray(ds["cluster_centroids"].data)
+        self._time_array = np.ascontiguousarray(ds["time"].data)
+        # Materialize the attributes once instead of looking up every key on
+        # the Dataset.
+        attrs = dict(ds.attrs)
+        (
+            self._svd_rank,
+            self._n_slides,
+            self._window_length,
+            self._n_components,
+            self._n_data_vars,
+            self._n_time_steps,
+            self._step_size,
+            self._non_integer_n_slide,
+            self._global_svd,
+        ) = itemgetter(*self._ATTR_KEYS)(attrs)
+        self._build_window_indices()
+        self._invalidate_caches()
 
         self._pydmd_kwargs = {}
-        for attr in ds.attrs:
-            if "pydmd_kwargs" in attr:
-                new_attr_name = attr.replace("pydmd_kwargs__", "")
+        if "pydmd_kwargs_json" in attrs:
+            for kw, kw_val in json.loads(attrs["pydmd_kwargs_json"]).items():
+                self._pydmd_kwargs[kw] = self._xarray_unsanitize(kw_val)
+
+        # Array valued kwargs, and every kwarg of Datasets written before the
+        # JSON attribute was introduced, are stored one attribute per kwarg.
+        prefix = "pydmd_kwargs__"
+        for attr, value in attrs.items():
+            if attr.startswith(prefix):
+                new_attr_name = attr[len(prefix) :]
                 self._pydmd_kwargs[new_attr_name] = self._xarray_unsanitize(
-                    ds.attrs[attr]
+                    value
                 )
-                if new_attr_name == "eig_constraints":
-                    self._pydmd_kwargs[new_attr_name] = set(
-                        self._pydmd_kwargs[new_attr_name]
-                    )
-            elif "omega_transformation" in attr:
-                self._transform_method = self._xarray_unsanitize(ds.attrs[attr])
+            elif attr == "omega_transformation":
+                self._transform_method = self._xarray_unsanitize(value)
+
+        if "eig_constraints" in self._pydmd_kwargs:
+            self._pydmd_kwargs["eig_constraints"] = set(
+                self._pydmd_kwargs["eig_constraints"]
+            )
 
         return self
 
@@ -1560,13 +2186,26 @@ class COSTS:
         :return: value unaltered except if value NoneType.
         """
         if value is None:
-            value = "None"
+            value = _NONE_SENTINEL
         elif isinstance(value, set):
             value = list(value)
         elif callable(value):
             value = f"Custom function {value.__name__}"
         return value
 
+    @staticmethod
+    def _json_default(value):
+        """Convert the numpy types in the pydmd_kwargs for JSON serialization.
+
+        :param value: Value that the json module cannot serialize.
+        :return: Python equivalent of `value`.
+        """
+        if isinstance(value, (np.generic, np.ndarray)):
+            return value.tolist()
+        raise TypeError(
+            f"Object of type {type(value).__name__:} is not JSON serializable"
+        )
+
     @staticmethod
     def _xarray_unsanitize(value):
         """Handle Nones in the pydmd_kwargs (i.e., used default values)
@@ -1578,15 +2217,9 @@ class COSTS:
         :param value: Value stored in the attributes of an xarray Dataset.
         :return: value unaltered except if value is the string "None".
         """
-        # To handle the varying behavior between python versions when evaluating
-        # a mixed type statement we have to try to catch cases when `value` is
-        # an array (e.g., `proj_basis` kwarg). The except block should not be
-        # triggered but is meant to catch edge cases when the user provides
-        # an unexpected type (e.g., tuple).
-        if not hasattr(value, "shape"):
-            try:
-                if value == "None":
-                    return None
-            except ValueError:
-                return value
+        # Only strings can be the sanitized None. Dispatching on the type
+        # avoids comparing arrays (e.g., the `proj_basis` kwarg) or other
+        # unexpected types (e.g., tuple) with a string.
+        if isinstance(value, str) and value == _NONE_SENTINEL:
+            return None
         return value
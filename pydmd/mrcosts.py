@@ -9,10 +9,9 @@ multiscale nonlinear physics. Physics Review E, 99(6),
 """
 
 import os
-import copy
 import numpy as np
 from sklearn.cluster import MiniBatchKMeans
-from sklearn.metrics import silhouette_score, calinski_harabasz_score
+from sklearn.metrics import calinski_harabasz_score
 import xarray as xr
 from pydmd.costs import COSTS
 
@@ -354,8 +353,9 @@ class mrCOSTS:
                 )
                 x_iter = xr_low_frequency
 
-            # Save the fitted costs object.
-            self._costs_array.append(copy.copy(mrd))
+            # Save the fitted costs object. A new object is built for each
+            # decomposition level, so it does not need to be copied.
+            self._costs_array.append(mrd)
 
     @staticmethod
     def interp_fill(
@@ -560,18 +560,41 @@ class mrCOSTS:
         self._n_data_vars = n_data_vars
         self._n_time_steps = n_time_steps
 
-    def to_netcdf(self, filename):
+    def to_netcdf(self, filename, complevel=4):
         """
         Save the mrCoSTS fit to file in netcdf format.
 
         Each decomposition level is saved as a separate file with a common
-        name and an identifier for the decomposition level.
+        name and an identifier for the decomposition level. The files are
+        written with h5netcdf, which stores the complex arrays (e.g., the
+        modes) natively as HDF5 compound types without any conversion. Each
+        file is therefore a self-contained copy of its COSTS fit.
 
         :param filename: Common name shared by each file.
         :type filename: str
+        :param complevel: Level of the zlib compression (1 to 9) of the
+            per-window variables, which are chunked into whole windows. 0
+            disables the compression. Default is 4.
+        :type complevel: int
         """
         for c in self._costs_array:
-            c.to_xarray().to_netcdf(
+            ds = c.to_xarray()
+            encoding = {}
+            if complevel:
+                for name, da in ds.data_vars.items():
+                    if not da.dims or da.dims[0] != "window_time_means":
+                        continue
+                    # Chunks of whole windows of about 1 MiB each, so that
+                    # reading a window only decompresses its own chunk.
+                    window_nbytes = max(da.nbytes // da.shape[0], 1)
+                    n_windows = min(max(2**20 // window_nbytes, 1), da.shape[0])
+                    encoding[name] = {
+                        "zlib": True,
+                        "complevel": complevel,
+                        "shuffle": True,
+                        "chunksizes": (n_windows,) + da.shape[1:],
+                    }
+            ds.to_netcdf(
                 ".".join(
                     (
                         filename,
@@ -581,6 +604,7 @@ class mrCOSTS:
                 ),
                 engine="h5netcdf",
                 invalid_netcdf=True,
+                encoding=encoding,
             )
 
     def _plot_helper_data_check(self, level, data=None):
@@ -820,20 +844,18 @@ class mrCOSTS:
                 "random_state", random_state
             )
         clustering = method(n_clusters=n_components, **clustering_kwargs)
-        if not hasattr(clustering, "fit_predict") and callable(
-            getattr(clustering, "fit_predict")
-        ):
+        if not callable(getattr(clustering, "fit_predict", None)):
             raise ValueError(
                 "Clustering method must have `fit_predict()` method."
             )
 
         omega_classes = clustering.fit_predict(np.atleast_2d(omega_array).T)
-        cluster_centroids = clustering.cluster_centers_.flatten()
+        cluster_centroids = clustering.cluster_centers_.ravel()
 
         # Sort the clusters by the centroid magnitude.
         idx = np.argsort(cluster_centroids)
-        lut = np.zeros_like(idx)
-        lut[idx] = np.arange(n_components)
+        # The inverse permutation maps the old classes to the sorted classes.
+        lut = np.argsort(idx)
         omega_classes = lut[omega_classes]
         cluster_centroids = cluster_centroids[idx]
 
@@ -847,6 +869,7 @@ class mrCOSTS:
         verbose=True,
         method=MiniBatchKMeans,
         clustering_kwargs=None,
+        sample_size=None,
     ):
         """
         Hyperparameter search for n_components for kmeans clustering.
@@ -864,10 +887,13 @@ class mrCOSTS:
             MiniBatchKMeans.
         :type method: method
         :param score_method: Valid scoring methods are 'silhouette' and
-            'calinski-harabasz'. Default is the silhouette score, which can
-            be slow for large numbers of samples.
+            'calinski-harabasz'. Default is the silhouette score.
         :type score_method: str or None
         :param clustering_kwargs: Keywords to pass to the clustering method.
+        :param sample_size: Number of randomly drawn eigenvalues used for the
+            silhouette score, see `sklearn.metrics.silhouette_score`. Default
+            is None, which scores all eigenvalues exactly.
+        :type sample_size: int or NoneType
         :return score: Scores for each n_components in n_components_range
         :rtype score: numpy.ndarray
         :return n_components: Optimal n_components for frequency band separation
@@ -887,9 +913,8 @@ class mrCOSTS:
             )
 
             if score_method is None or score_method == "silhouette":
-                score[nind] = silhouette_score(
-                    omega.reshape(-1, 1),
-                    omega_classes.reshape(-1, 1),
+                score[nind] = COSTS._silhouette_score_1d(
+                    omega, omega_classes, sample_size=sample_size
                 )
             # Calinski-Harabasz is not a good counter to the silhouette score
             # since it just increases with increasing number of clusters. It is
@@ -987,18 +1012,29 @@ class mrCOSTS:
         :return: transformed omega array
         :rtype: numpy.ndarray
         """
+        # The imaginary part is used in its own precision without a copy,
+        # only non-floating types are cast to float64.
+        omega_imag = omega_array.imag
+        omega_imag = omega_imag.astype(
+            np.result_type(omega_imag.dtype, np.float32), copy=False
+        )
+
         # @ToDo: Move to a set-based evaluation.
         if transform_method is None or transform_method == "absolute":
-            omega_array = np.abs(omega_array.imag.astype("float"))
+            omega_array = np.abs(omega_imag)
         elif transform_method == "square_frequencies":
-            omega_array = (omega_array.imag**2).real.astype("float")
+            omega_array = np.square(omega_imag)
         elif transform_method == "period":
-            omega_array = 1 / np.abs(omega_array.imag.astype("float"))
+            omega_array = np.abs(omega_imag)
+            np.reciprocal(omega_array, out=omega_array)
         elif transform_method == "log10":
-            omega_array = np.log10(np.abs(omega_array.imag.astype("float")))
+            omega_array = np.abs(omega_imag)
+            nonzero = omega_array > 0
+            np.log10(omega_array, where=nonzero, out=omega_array)
             # Impute log10(0) with the smallest non-zero values in log10(omega).
-            zero_imputer = omega_array[np.isfinite(omega_array)].min()
-            omega_array[~np.isfinite(omega_array)] = zero_imputer
+            omega_array[~nonzero] = (
+                omega_array[nonzero].min() if nonzero.any() else 0.0
+            )
         else:
             # @ToDo: Return accepted methods
             raise ValueError(
@@ -1023,14 +1059,17 @@ class mrCOSTS:
         :rtype: numpy.ndarray
         """
 
-        # Each individual reconstructed window
+        # Each individual reconstructed window, in the precision of the fits.
         xr_sep = np.zeros(
             (
                 self.n_decompositions,
                 self._n_components_global,
                 self._n_data_vars,
                 self._n_time_steps,
-            )
+            ),
+            dtype=np.result_type(
+                *[mrd.modes_array.real.dtype for mrd in self._costs_array]
+            ),
         )
 
         omega_classes_list = self.multi_res_deterp()
@@ -1040,73 +1079,48 @@ class mrCOSTS:
             xn = np.zeros(self._n_time_steps)
 
             # Convolve each windowed reconstruction with a gaussian filter.
-            # Std dev of gaussian filter
-            recon_filter_sd = mrd.window_length / 8
-            recon_filter = np.exp(
-                -(
-                    (np.arange(mrd.window_length) - (mrd.window_length + 1) / 2)
-                    ** 2
-                )
-                / recon_filter_sd**2
-            )
+            # The filter is shared with (and cached by) COSTS.
+            recon_filter = mrd.build_kern(mrd.window_length)
             omega_classes = omega_classes_list[n_mrd]
 
             if mrd.svd_rank < np.max(self._svd_rank_array):
                 truncate_slice = slice(None, mrd.svd_rank)
                 omega_classes = omega_classes[:, truncate_slice]
 
+            # The masks of every frequency band for every window, built once
+            # with dimensions of n_slides x n_components x svd_rank.
+            class_masks = (
+                omega_classes[:, np.newaxis, :]
+                == np.arange(self._n_components_global)[:, np.newaxis]
+            )
+
             # Iterate over each window slide performed.
             for k in range(mrd.n_slides):
+                # Slices of the contiguous per-window arrays are views.
                 w = mrd.modes_array[k]
                 b = mrd.amplitudes_array[k]
-                omega = np.atleast_2d(mrd.omega_array[k]).T
-                classification = omega_classes[k]
+                omega = mrd.omega_array[k, :, None]
 
                 # Compute each segment of xr starting at "t = 0"
-                t = mrd.time_array[k]
-                t_start = mrd.time_array[k, 0]
-                t = t - t_start
+                t = mrd.time_array[k] - mrd.time_array[k, 0]
+                # The time dynamics of this window are shared by all bands.
+                dynamics = np.exp(omega * t) * b[:, None]
 
-                # Reconstruct each frequency band separately.
-                xr_sep_window = np.zeros(
-                    (
-                        self._n_components_global,
-                        self._n_data_vars,
-                        mrd.window_length,
-                    )
-                )
+                # Reconstruct each frequency band separately. The dynamics are
+                # grouped by band with the class masks, so one batched matrix
+                # product gives n_components x n_data_vars x window_length.
+                xr_sep_window = np.matmul(
+                    w, class_masks[k][:, :, None] * dynamics
+                ).real
 
                 # Get the indices for this window.
-                if k == mrd.n_slides - 1 and mrd._non_integer_n_slide:
-                    # Handle non-integer number of window slides by slightly
-                    # shortening the last window's slide.
-                    window_indices = slice(-mrd.window_length, None)
-                else:
-                    window_indices = slice(
-                        k * mrd.step_size,
-                        k * mrd.step_size + mrd.window_length,
-                    )
+                window_indices = mrd.get_window_indices(k)
 
-                for j in np.arange(0, self._n_components_global):
-                    class_ind = classification == j
-                    xr_sep_window[j, :, :] = np.linalg.multi_dot(
-                        [
-                            w[:, class_ind],
-                            np.diag(b[class_ind]),
-                            np.exp(omega[class_ind] * t),
-                        ]
-                    )
-
-                    # Multiply by the reconstruction filter which weights
-                    # the reconstruction towards the middle of the window.
-                    xr_sep_window[j, :, :] = (
-                        xr_sep_window[j, :, :] * recon_filter
-                    )
-
-                    xr_sep[n_mrd, j, :, window_indices] = (
-                        xr_sep[n_mrd, j, :, window_indices]
-                        + xr_sep_window[j, :, :]
-                    )
+                # Multiply by the reconstruction filter which weights the
+                # reconstruction towards the middle of the window, in place,
+                # and add all frequency bands to the window's time slice.
+                xr_sep_window *= recon_filter
+                xr_sep[n_mrd, :, :, window_indices] += xr_sep_window
 
                 # A normalization factor which weights the global reconstruction
                 # by the number of window centers it contains. This accounts
@@ -1114,7 +1128,7 @@ class mrCOSTS:
                 xn[window_indices] += recon_filter
 
             # Normalize by the reconstruction filter.
-            xr_sep[n_mrd, :, :, :] = xr_sep[n_mrd, :, :, :] / xn
+            xr_sep[n_mrd] /= xn
 
         return xr_sep
 
@@ -1126,7 +1140,7 @@ class mrCOSTS:
         :rtype: numpy.ndarray
         """
 
-        background = self.costs_array[-1].scale_reconstruction()[0, :, :]
+        background, _ = self.costs_array[-1].scale_separation()
         return background
 
     def global_reconstruction(self):
@@ -112,7 +112,7 @@ def compute_rank(X: np.ndarray, svd_rank: Number = 0) -> int:
     singular values is, IEEE Transactions on Information Theory 60.8
     (2014): 5040-5053.
     """
-    _, s, _ = np.linalg.svd(X, full_matrices=False)
+    s = np.linalg.svd(X, compute_uv=False)
     return _compute_rank(s, X.shape[0], X.shape[1], svd_rank)
 
 
@@ -2,6 +2,7 @@ import numpy as np
 from scipy.integrate import solve_ivp
 import scipy
 from pytest import raises
+from sklearn.metrics import silhouette_score
 
 from pydmd.costs import COSTS
 
@@ -152,6 +153,13 @@ def test_construction():
     assert mrd.global_svd is True
     assert mrd.step_size == step
 
+    # The last window is shifted to end on the final time step.
+    assert np.shape(mrd._window_indices) == (mrd.n_slides, mrd.window_length)
+    assert mrd._window_indices[-1, -1] == len(time) - 1
+    np.testing.assert_equal(
+        mrd._window_indices[1], np.arange(step, step + window)
+    )
+
 
 def test_bad_construction():
     """Test bad fit and construction keywords and parameters."""
@@ -161,6 +169,14 @@ def test_bad_construction():
             data, np.atleast_2d(time), len(time) + 1, step, verbose=False
         )
 
+    with raises(ValueError):
+        COSTS(
+            svd_rank=rank,
+            initialize_artificially=True,
+            init_alpha=np.ones(rank) * 1j,
+            cluster_centroids=np.ones(rank // 2),
+        )
+
 
 def test_integer_window_construction():
     """Force COSTS to build an integer number of windows."""
@@ -183,6 +199,49 @@ def test_frequency_band_centroids():
     assert mrd_no_clustering.cluster_centroids is None
 
 
+def test_cluster_hyperparameter_sweep():
+    """The sweep finds the two frequency bands, also when run in parallel."""
+    n_components_range = np.arange(2, 6)
+    n_optimal = mrd.cluster_hyperparameter_sweep(
+        n_components_range, transform_method=transform_method
+    )
+    assert n_optimal == 2
+    assert (
+        mrd.cluster_hyperparameter_sweep(
+            n_components_range, transform_method=transform_method, n_jobs=2
+        )
+        == n_optimal
+    )
+    assert (
+        mrd.cluster_hyperparameter_sweep(
+            n_components_range,
+            transform_method=transform_method,
+            sample_size=200,
+        )
+        == n_optimal
+    )
+
+
+def test_silhouette_score_1d():
+    """The 1D silhouette equals the sklearn silhouette score."""
+    rng = np.random.default_rng(0)
+    x = rng.normal(1e3, 1.0, 2000) + rng.integers(0, 3, 2000) * 5.0
+    labels = np.digitize(x, [1002.5, 1007.5])
+    expected = silhouette_score(x[:, np.newaxis].astype(np.float64), labels)
+
+    np.testing.assert_allclose(
+        COSTS._silhouette_score_1d(x, labels), expected, rtol=1e-9
+    )
+    # Single precision values are scored in double precision.
+    np.testing.assert_allclose(
+        COSTS._silhouette_score_1d(x.astype(np.float32), labels),
+        silhouette_score(
+            x.astype(np.float32)[:, np.newaxis].astype(np.float64), labels
+        ),
+        rtol=1e-9,
+    )
+
+
 def test_reconstruction():
     """
     Tests the accuracy of the reconstructed data.
@@ -203,6 +262,34 @@ def test_scale_separation():
     np.testing.assert_allclose(re_hf, expected_hf_error, atol=0.02)
 
 
+def test_scale_reconstruction_cache():
+    """The cached scale reconstruction is returned as writable copies."""
+    assert mrd.scale_reconstruction().flags.writeable
+    assert not mrd._scale_recon_cache
+
+    mrd._cache_reconstruction = True
+    try:
+        xr_sep = mrd.scale_reconstruction()
+        assert mrd._scale_reconstruction() is mrd._scale_recon_cache[True]
+        assert xr_sep.flags.writeable
+
+        # Editing the returned arrays does not alter the cache.
+        expected = xr_sep.copy()
+        xr_sep -= 1
+        xr_low_frequency, _ = mrd.scale_separation()
+        xr_low_frequency[...] = 0
+        np.testing.assert_array_equal(mrd.scale_reconstruction(), expected)
+
+        # Only the latest reconstruction is kept.
+        assert not np.array_equal(
+            mrd.scale_reconstruction(include_means=False), expected
+        )
+        assert list(mrd._scale_recon_cache) == [False]
+    finally:
+        mrd._cache_reconstruction = False
+        mrd._invalidate_caches()
+
+
 def test_omega_transforms():
     """
     Tests that the COSTS module correctly transforms the eigenvalues yielding...
@@ -254,11 +341,20 @@ def test_omega_transforms():
 def test_to_xarray():
     """Tests the round trip conversion to and from xarray."""
     ds = mrd.to_xarray()
+    # The Dataset wraps the fitted arrays without copies.
+    for var, array in (
+        ("modes", mrd.modes_array),
+        ("omega", mrd.omega_array),
+        ("amplitudes", mrd.amplitudes_array),
+    ):
+        assert np.shares_memory(ds[var].data, array)
     mrd_convert = mrd.from_xarray(ds)
 
     assert np.allclose(mrd.omega_array, mrd_convert.omega_array)
     assert np.allclose(mrd.modes_array, mrd_convert.modes_array)
     assert np.allclose(mrd.cluster_centroids, mrd_convert.cluster_centroids)
+    # The arrays of an in-memory Dataset are used without copies.
+    assert np.shares_memory(ds.modes.data, mrd_convert.modes_array)
 
     # The round trip of the pydmd_kwargs is sensitive to python and numpy
     # version.
@@ -269,6 +365,18 @@ def test_to_xarray():
         if not kw == "proj_basis":
             assert mrd._pydmd_kwargs[kw] == mrd_convert._pydmd_kwargs[kw]
 
+    # Datasets stored with one attribute per pydmd kwarg can still be read.
+    ds_legacy = ds.copy()
+    del ds_legacy.attrs["pydmd_kwargs_json"]
+    for kw, kw_val in mrd._pydmd_kwargs.items():
+        ds_legacy.attrs[f"pydmd_kwargs__{kw}"] = COSTS._xarray_sanitize(kw_val)
+    mrd_legacy = COSTS().from_xarray(ds_legacy)
+    assert mrd_legacy._pydmd_kwargs.keys() == mrd._pydmd_kwargs.keys()
+    assert (
+        mrd_legacy._pydmd_kwargs["eig_constraints"]
+        == mrd._pydmd_kwargs["eig_constraints"]
+    )
+
 
 def test_plotters():
     """Determine no errors are triggered when plotting."""
@@ -278,3 +386,199 @@ def test_plotters():
     mrd.plot_time_series(1, data)
     mrd.plot_omega_histogram()
     mrd.plot_omega_time_series()
+
+
+def test_parallel_fit():
+    """Fitting the windows in threads matches the sequential fit."""
+    mrd_parallel = COSTS(
+        svd_rank=rank,
+        global_svd=True,
+        pydmd_kwargs=pydmd_kwargs,
+    )
+    mrd_parallel.fit(data, np.atleast_2d(time), window, step, n_jobs=2)
+
+    np.testing.assert_allclose(mrd_parallel.omega_array, mrd.omega_array)
+    np.testing.assert_allclose(mrd_parallel.modes_array, mrd.modes_array)
+    np.testing.assert_allclose(
+        mrd_parallel.amplitudes_array, mrd.amplitudes_array
+    )
+
+    mrd_local = COSTS(svd_rank=rank, global_svd=False)
+    with raises(ValueError):
+        mrd_local.fit(data, np.atleast_2d(time), window, step, n_jobs=2)
+
+    mrd_bagging = COSTS(
+        svd_rank=rank,
+        global_svd=True,
+        pydmd_kwargs={**pydmd_kwargs, "num_trials": 3},
+    )
+    with raises(ValueError):
+        mrd_bagging.fit(data, np.atleast_2d(time), window, step, n_jobs=2)
+
+    for n_jobs in (0, -2, 1.5, "2"):
+        with raises(ValueError):
+            mrd_parallel.fit(
+                data, np.atleast_2d(time), window, step, n_jobs=n_jobs
+            )
+
+
+def test_single_precision_fit():
+    """Fitting in single precision stores complex64 results."""
+    mrd_single = COSTS(
+        svd_rank=rank,
+        global_svd=True,
+        pydmd_kwargs=pydmd_kwargs,
+    )
+    mrd_single.fit(data, np.atleast_2d(time), window, step, precision="single")
+
+    assert mrd_single.modes_array.dtype == np.complex64
+    assert mrd_single.omega_array.dtype == np.complex64
+    assert mrd_single.amplitudes_array.dtype == np.complex64
+    np.testing.assert_allclose(
+        mrd_single.omega_array, mrd.omega_array, rtol=1e-5, atol=1e-6
+    )
+
+    # The single precision is kept through the reconstruction.
+    mrd_single.cluster_omega(n_components=2, transform_method=transform_method)
+    xr_sep = mrd_single.scale_reconstruction()
+    assert xr_sep.dtype == np.float32
+    np.testing.assert_allclose(
+        xr_sep, mrd.scale_reconstruction(), rtol=1e-3, atol=1e-3
+    )
+
+    with raises(ValueError):
+        mrd_single.fit(
+            data, np.atleast_2d(time), window, step, precision="half"
+        )
+
+
+def test_cluster_1d():
+    """The 1D k-means separates well separated groups of values."""
+    x = np.concatenate((np.full(5, 3.0), np.full(7, 1.0), np.full(3, 8.0)))
+    centroids, labels = COSTS._cluster_1d(x, 3)
+
+    np.testing.assert_allclose(centroids, [1.0, 3.0, 8.0])
+    np.testing.assert_equal(labels, np.repeat([1, 0, 2], [5, 7, 3]))
+
+    # The 1D k-means is selected with method=None and takes no kwargs.
+    centroids, omega_classes = mrd._cluster(
+        2, transform_method=transform_method, method=None
+    )
+    assert centroids.shape == (2,)
+    assert omega_classes.shape == mrd.omega_array.shape
+    with raises(ValueError):
+        mrd._cluster(2, kmeans_kwargs={"random_state": 0}, method=None)
+
+
+def test_scale_reconstruction_chunks():
+    """Reconstructing the windows in batches does not change the result."""
+    omega_classes = mrd._omega_classes.copy()
+    # One window without eigenvalues in the lowest frequency band, which
+    # still receives the window mean.
+    lowest_frequency_band = np.argmin(mrd._cluster_centroids)
+    mrd._omega_classes[5] = lowest_frequency_band + 1
+    mrd._invalidate_caches()
+    try:
+        xr_sep = mrd.scale_reconstruction()
+        mrd._CHUNK_ELEMENTS = 1
+        mrd._invalidate_caches()
+        np.testing.assert_array_equal(mrd.scale_reconstruction(), xr_sep)
+    finally:
+        mrd._omega_classes = omega_classes
+        mrd.__dict__.pop("_CHUNK_ELEMENTS", None)
+        mrd._invalidate_caches()
+
+
+def test_omega_transform_cache():
+    """Transforms of the fitted omega are cached and read-only."""
+    omega_transform = mrd.transform_omega(
+        mrd.omega_array.reshape(-1), transform_method="period"
+    )
+    assert (
+        mrd.transform_omega(
+            mrd.omega_array.reshape(-1), transform_method="period"
+        )
+        is omega_transform
+    )
+    assert not omega_transform.flags.writeable
+    assert mrd._omega_label == "Period"
+
+    # Copies of omega are transformed without being cached.
+    omega_copy = mrd.transform_omega(
+        mrd.omega_array.copy(), transform_method="period"
+    )
+    assert omega_copy.flags.writeable
+    np.testing.assert_array_equal(omega_copy.reshape(-1), omega_transform)
+
+    # Clustering does not change omega, so it keeps the cached transforms.
+    mrd.cluster_omega(n_components=2, transform_method="period")
+    assert (
+        mrd.transform_omega(
+            mrd.omega_array.reshape(-1), transform_method="period"
+        )
+        is omega_transform
+    )
+    mrd.cluster_omega(n_components=2, transform_method=transform_method)
+
+    # A Fortran-ordered view has the same buffer and shape as omega but
+    # a different element order.
+    omega_fortran = mrd.omega_array.reshape(mrd.omega_array.shape[::-1]).T
+    omega_absolute = mrd.transform_omega(
+        mrd.omega_array, transform_method="absolute"
+    )
+    np.testing.assert_array_equal(
+        mrd.transform_omega(omega_fortran, transform_method="absolute"),
+        np.abs(omega_fortran.imag),
+    )
+    np.testing.assert_array_equal(
+        mrd.transform_omega(mrd.omega_array.T, transform_method="absolute"),
+        omega_absolute.T,
+    )
+
+
+def test_numpy_integer_rank():
+    """A numpy integer rank is a fixed rank for the local svd fits."""
+    mrd_local = COSTS(svd_rank=np.int64(rank), global_svd=False)
+    mrd_local.fit(data, np.atleast_2d(time), window, step * 2)
+    assert mrd_local.svd_rank == rank
+    assert np.shape(mrd_local.modes_array)[-1] == rank
+
+
+def test_fit_chunks():
+    """Preparing the windows in batches does not change the fit."""
+    mrd_chunks = COSTS(
+        svd_rank=rank,
+        global_svd=True,
+        pydmd_kwargs=pydmd_kwargs,
+    )
+    mrd_chunks._CHUNK_ELEMENTS = 1
+    mrd_chunks.fit(data, np.atleast_2d(time), window, step)
+    np.testing.assert_array_equal(mrd_chunks.omega_array, mrd.omega_array)
+    np.testing.assert_array_equal(
+        mrd_chunks.window_means_array, mrd.window_means_array
+    )
+
+    # The local rank truncation uses the singular values of each batch.
+    mrd_local = COSTS(svd_rank=0, global_svd=False)
+    mrd_local.fit(data, np.atleast_2d(time), window, step * 4)
+    mrd_local_chunks = COSTS(svd_rank=0, global_svd=False)
+    mrd_local_chunks._CHUNK_ELEMENTS = 1
+    mrd_local_chunks.fit(data, np.atleast_2d(time), window, step * 4)
+    np.testing.assert_array_equal(
+        mrd_local_chunks.omega_array, mrd_local.omega_array
+    )
+
+
+def test_randomized_proj_basis():
+    """The randomized projection basis spans the exact global svd basis."""
+    mrd_exact = COSTS(svd_rank=rank, global_svd=True)
+    u_exact = mrd_exact._build_proj_basis(data, svd_rank=rank)
+    mrd_randomized = COSTS(
+        svd_rank=rank, global_svd=True, use_randomized_svd=True
+    )
+    u_randomized = mrd_randomized._build_proj_basis(data, svd_rank=rank)
+
+    assert u_randomized.shape == u_exact.shape
+    np.testing.assert_allclose(
+        u_randomized @ u_randomized.T, u_exact @ u_exact.T, atol=1e-8
+    )
@@ -3,6 +3,7 @@ import os
 import numpy as np
 from scipy.integrate import solve_ivp
 import scipy
+import xarray as xr
 from pytest import raises
 
 from pydmd.mrcosts import mrCOSTS
@@ -211,6 +212,17 @@ def test_frequency_band_centroids():
     assert mrc_no_clustering.transform_method is None
 
 
+def test_bad_clustering_method():
+    """Clustering methods without `fit_predict` are rejected."""
+
+    class NoFitPredict:
+        def __init__(self, n_clusters, random_state):
+            self.n_clusters = n_clusters
+
+    with raises(ValueError):
+        mrc.global_cluster_omega(method=NoFitPredict)
+
+
 def test_reconstructions():
     """
     Tests the accuracy of the reconstructed data.
@@ -221,6 +233,9 @@ def test_reconstructions():
     xr_lf = mrc.get_background()
     xr_global = mrc.global_reconstruction()
 
+    # The fitted levels do not keep their reconstructions alive.
+    assert not any(level._scale_recon_cache for level in mrc.costs_array)
+
     mrd = mrc.costs_array[0]
     re_global = mrd.relative_error(xr_global, data)
     re_lf = mrd.relative_error(xr_lf, low_frequency)
@@ -302,6 +317,11 @@ def test_netcdf():
         )
     assert np.allclose(mrc.cluster_centroids, mrc.cluster_centroids)
 
+    # The per-window variables are compressed in chunks of whole windows.
+    with xr.open_dataset(file_list[0], engine="h5netcdf") as ds:
+        assert ds.modes.encoding["zlib"]
+        assert ds.modes.encoding["chunksizes"][1:] == ds.modes.shape[1:]
+
 
 def test_plot_local_reconstructions():
     """